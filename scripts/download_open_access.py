@@ -2,23 +2,35 @@
 """Download PDFs by DOI using Unpaywall with optional scihub-cli fallback."""
 
 import argparse
-import json
+import codecs
+import errno
+import functools
+import hashlib
 import os
+import queue
 import re
 import shlex
 import shutil
+import string
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 import urllib.error
 import urllib.parse
-import urllib.request
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from http_client import ACCEPT_COMPRESSED, json_dumps, json_loads, open_url, read_body, read_json
 
 UNPAYWALL_URL = "https://api.unpaywall.org/v2"
 USER_AGENT = "sci-papers-downloder/1.1"
+CACHE_ROOT = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "sci-papers-downloder"
+UNPAYWALL_CACHE_TTL_DAYS = 30.0
 UVX_FALLBACK_CMD = [
     "uvx",
     "--from",
@@ -26,6 +38,44 @@ UVX_FALLBACK_CMD = [
     "scihub-cli",
 ]
 
+HTML_SCAN_CHUNK = 16 * 1024
+CANDIDATE_CONCURRENCY = 4
+# Threads shared by every DOI's candidate fetches; http_client keeps connections
+# per thread, so long-lived threads are what lets PDF fetches reuse them.
+CANDIDATE_WORKERS = 32
+LOOKUP_CONCURRENCY = 16
+SCIHUB_BATCH_PARALLELISM = 4
+STREAM_CHUNK = 64 * 1024
+MAX_HTML_BYTES = 2 * 1024 * 1024
+
+_PDF_HREF_RE = re.compile(r".+\.pdf(?:\?.*)?", re.I | re.S)
+# Content types that can be rejected from headers alone, without reading any body bytes.
+_NON_DOCUMENT_TYPE_PREFIXES = (
+    "image/",
+    "audio/",
+    "video/",
+    "font/",
+    "application/json",
+    "application/javascript",
+    "text/css",
+    "text/javascript",
+)
+_FILENAME_SAFE_CHARS = frozenset(string.ascii_letters + string.digits + "._-")
+_UNDERSCORE_RUN_RE = re.compile(r"__+")
+_SAFE_FILENAME_RE = re.compile(r"[A-Za-z0-9._-]+")
+_SCIHUB_URL_RE = re.compile(r"Download URL:\s*(\S+)")
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# os.link failures that mean "no hard links here", as opposed to a real error.
+_NO_HARDLINK_ERRNOS = frozenset({errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK})
+# Syntactic DOI check only; anything failing it would just 404 at Unpaywall.
+_DOI_RE = re.compile(r"^10\.\d{4,9}/\S+$")
+
+# (Unpaywall record, error); exactly one of the two is None.
+LookupResult = Tuple[Optional[Dict[str, Any]], Optional[str]]
+# (ok, path, resolved_url, error) from a scihub-cli fallback attempt.
+FallbackOutcome = Tuple[bool, Optional[str], Optional[str], Optional[str]]
+
 
 @dataclass
 class FallbackConfig:
@@ -36,6 +86,44 @@ class FallbackConfig:
     setup_error: Optional[str] = None
 
 
+@dataclass
+class JsonFileCache:
+    """On-disk JSON cache with one file per key, expired by file mtime."""
+
+    root: Path
+    ttl_seconds: float
+
+    def path_for(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self.path_for(key)
+        try:
+            if time.time() - path.stat().st_mtime >= self.ttl_seconds:
+                return None
+            return json_loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        # Cache writes are best effort: a read-only or full disk must not fail a download.
+        path = self.path_for(key)
+        tmp_name: Optional[str] = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=path.parent)
+            with os.fdopen(fd, "wb") as f:
+                f.write(json_dumps(value))
+            os.replace(tmp_name, path)
+            tmp_name = None
+        except OSError:
+            pass
+        finally:
+            if tmp_name is not None:
+                Path(tmp_name).unlink(missing_ok=True)
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description=(
@@ -48,6 +136,30 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--email", help="Email for Unpaywall API. Defaults to UNPAYWALL_EMAIL env var.")
     parser.add_argument("--outdir", default="./downloads", help="Output directory for downloaded PDFs")
     parser.add_argument("--timeout", type=int, default=45, help="HTTP timeout seconds")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Number of DOIs downloaded in parallel (default: 8)",
+    )
+    parser.add_argument(
+        "--lookup-concurrency",
+        type=int,
+        default=LOOKUP_CONCURRENCY,
+        help=f"Number of parallel Unpaywall lookups feeding the downloads (default: {LOOKUP_CONCURRENCY})",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Do not read or write the Unpaywall response cache under {CACHE_ROOT}",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=UNPAYWALL_CACHE_TTL_DAYS,
+        help=f"Days a cached Unpaywall response stays valid (default: {UNPAYWALL_CACHE_TTL_DAYS:g})",
+    )
 
     parser.add_argument(
         "--scihub-fallback",
@@ -76,7 +188,10 @@ def parse_args() -> argparse.Namespace:
         "--scihub-timeout",
         type=int,
         default=180,
-        help="Per-DOI timeout for scihub-cli fallback execution (seconds)",
+        help=(
+            "Per-DOI timeout for scihub-cli fallback execution (seconds); "
+            "batched runs scale it by the number of DOIs per parallel slot"
+        ),
     )
 
     parser.add_argument("--json", action="store_true", help="Print JSON summary")
@@ -86,12 +201,18 @@ def parse_args() -> argparse.Namespace:
 
 def load_dois(args: argparse.Namespace) -> List[str]:
     dois: List[str] = []
+    invalid: List[str] = []
     seen = set()
 
     def push(value: str) -> None:
         doi = value.strip()
         if not doi or doi.startswith("#"):
             return
+        if not _DOI_RE.match(doi):
+            if doi not in invalid:
+                print(f"Skipping invalid DOI: {doi}", file=sys.stderr)
+                invalid.append(doi)
+            return
         if doi not in seen:
             seen.add(doi)
             dois.append(doi)
@@ -103,6 +224,7 @@ def load_dois(args: argparse.Namespace) -> List[str]:
         for line in Path(args.doi_file).read_text(encoding="utf-8").splitlines():
             push(line)
 
+    args.invalid_dois = invalid
     return dois
 
 
@@ -112,132 +234,411 @@ def quote_doi(doi: str) -> str:
 
 def unpaywall_lookup(doi: str, email: str, timeout: int) -> Dict[str, Any]:
     url = f"{UNPAYWALL_URL}/{quote_doi(doi)}?email={urllib.parse.quote(email, safe='@._+-')}"
-    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept": "application/json"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8", "ignore"))
+    headers = {
+        "User-Agent": USER_AGENT,
+        "Accept": "application/json",
+        "Accept-Encoding": ACCEPT_COMPRESSED,
+    }
+    with open_url(url, headers=headers, timeout=timeout) as resp:
+        return read_json(resp)
 
 
-def unique_urls(urls: List[Optional[str]]) -> List[str]:
-    out: List[str] = []
-    seen = set()
-    for url in urls:
-        if not url:
-            continue
-        u = url.strip()
-        if not u or u in seen:
-            continue
-        seen.add(u)
-        out.append(u)
-    return out
+def cached_unpaywall_lookup(
+    doi: str,
+    email: str,
+    timeout: int,
+    cache: Optional[JsonFileCache],
+) -> Dict[str, Any]:
+    if cache is None:
+        return unpaywall_lookup(doi, email, timeout)
+    key = doi.lower()
+    record = cache.get(key)
+    if record is None:
+        record = unpaywall_lookup(doi, email, timeout)
+        cache.put(key, record)
+    return record
 
 
-def build_candidate_urls(record: Dict[str, Any]) -> List[str]:
-    best = record.get("best_oa_location") or {}
-    urls: List[Optional[str]] = [
-        best.get("url_for_pdf"),
-        best.get("url"),
-    ]
+def lookup_doi(doi: str, email: str, timeout: int, cache: Optional[JsonFileCache]) -> LookupResult:
+    try:
+        return cached_unpaywall_lookup(doi, email, timeout, cache), None
+    except urllib.error.HTTPError as exc:
+        body = read_body(exc).decode("utf-8", "ignore")
+        return None, f"unpaywall_http_{exc.code}: {body}"
+    except Exception as exc:  # noqa: BLE001
+        return None, f"unpaywall_error: {exc}"
 
-    for location in record.get("oa_locations") or []:
-        urls.append(location.get("url_for_pdf"))
-        urls.append(location.get("url"))
 
-    return unique_urls(urls)
+def unpaywall_cache(ttl_days: float) -> JsonFileCache:
+    return JsonFileCache(root=CACHE_ROOT / "unpaywall", ttl_seconds=ttl_days * 86400)
 
 
-def maybe_extract_pdf_url_from_html(html_text: str) -> Optional[str]:
-    m = re.search(
-        r'<meta[^>]+name=["\']citation_pdf_url["\'][^>]+content=["\']([^"\']+)["\']',
-        html_text,
-        re.I,
-    )
-    if m:
-        return m.group(1)
+def build_candidate_urls(record: Dict[str, Any]) -> List[str]:
+    def iter_urls() -> Iterator[str]:
+        best = record.get("best_oa_location") or {}
+        for location in (best, *(record.get("oa_locations") or ())):
+            for key in ("url_for_pdf", "url"):
+                url = location.get(key)
+                if url and (url := url.strip()):
+                    yield url
+
+    # dict.fromkeys dedupes while keeping first-seen order.
+    return list(dict.fromkeys(iter_urls()))
+
+
+class _PdfLinkFound(Exception):
+    pass
+
+
+class _PdfLinkParser(HTMLParser):
+    """Find citation_pdf_url, falling back to the first href ending in .pdf."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.meta_url: Optional[str] = None
+        self.href_url: Optional[str] = None
+        self.in_body = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        values = dict(attrs)
+        if tag == "meta" and (values.get("name") or "").lower() == "citation_pdf_url":
+            if values.get("content"):
+                self.meta_url = values["content"]
+                raise _PdfLinkFound
+        href = values.get("href")
+        if self.href_url is None and href and _PDF_HREF_RE.fullmatch(href):
+            self.href_url = href
+        if tag == "body":
+            self.in_body = True
+        # citation_pdf_url lives in <head>; once in <body> the first .pdf link wins.
+        if self.in_body and self.href_url:
+            raise _PdfLinkFound
+
+
+class PdfLinkScanner:
+    """Feed HTML bytes incrementally; done as soon as the PDF link is certain."""
+
+    def __init__(self) -> None:
+        self._parser = _PdfLinkParser()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self.done = False
+
+    def feed(self, data: bytes) -> bool:
+        if not self.done:
+            try:
+                self._parser.feed(self._decoder.decode(data))
+            except _PdfLinkFound:
+                self.done = True
+            except Exception:  # noqa: BLE001
+                # Malformed markup ends the scan; keep whatever was found before it.
+                self.done = True
+        return self.done
+
+    def result(self) -> Optional[str]:
+        if not self.done:
+            self.done = True
+            try:
+                self._parser.feed(self._decoder.decode(b"", final=True))
+                self._parser.close()
+            except Exception:  # noqa: BLE001
+                pass
+        return self._parser.meta_url or self._parser.href_url
 
-    m = re.search(r'href=["\']([^"\']+\.pdf(?:\?[^"\']*)?)["\']', html_text, re.I)
-    if m:
-        return m.group(1)
 
-    return None
+def is_pdf(data: bytes, content_type: str) -> bool:
+    return data.startswith(b"%PDF") or "pdf" in (content_type or "").lower()
+
 
+class _FilenameCharMap(dict):
+    """str.translate table sending every char outside [A-Za-z0-9._-] to "_", filled lazily."""
 
-def fetch_url_bytes(url: str, timeout: int) -> Tuple[bytes, str, str]:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": USER_AGENT,
-            "Accept": "application/pdf, text/html;q=0.9, */*;q=0.8",
-        },
-    )
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        data = resp.read()
-        content_type = resp.headers.get_content_type() if resp.headers else ""
-        final_url = resp.geturl()
-    return data, content_type, final_url
+    def __missing__(self, codepoint: int) -> int:
+        value = codepoint if chr(codepoint) in _FILENAME_SAFE_CHARS else ord("_")
+        self[codepoint] = value
+        return value
 
 
-def is_pdf(data: bytes, content_type: str) -> bool:
-    return data.startswith(b"%PDF") or "pdf" in (content_type or "").lower()
+_FILENAME_CHAR_MAP = _FilenameCharMap()
 
 
 def safe_filename(value: str, default: str) -> str:
     text = value.strip() if value else ""
     if not text:
         text = default
-    text = re.sub(r"[^A-Za-z0-9._-]+", "_", text)
+    # Most DOIs and titles need no rewriting; one C-level match skips the translate pass.
+    if not _SAFE_FILENAME_RE.fullmatch(text) or "__" in text:
+        text = _UNDERSCORE_RUN_RE.sub("_", text.translate(_FILENAME_CHAR_MAP))
     text = text.strip("._")
     if not text:
         text = default
     return text[:120]
 
 
+class OutputNames:
+    """Hands out unique file names in one directory from an in-memory set.
+
+    The directory is listed once; after that, allocation makes no filesystem
+    calls. Names are reserved as soon as they are handed out, so concurrent
+    DOIs never receive the same path even before anything is written; a name
+    that ends up unused is handed back with release(). Files other processes
+    create later are not seen here; link_into_place() catches those on write.
+    """
+
+    def __init__(self, dirpath: Path) -> None:
+        self.dirpath = dirpath
+        self._lock = threading.Lock()
+        self._stems: Dict[str, Tuple[str, str]] = {}
+        try:
+            with os.scandir(dirpath) as it:
+                self._used = {entry.name for entry in it}
+        except FileNotFoundError:
+            self._used = set()
+
+    def allocate(self, stem: str, suffix: str) -> Path:
+        with self._lock:
+            name = f"{stem}{suffix}"
+            if name not in self._used:
+                self._used.add(name)
+                self._stems[name] = (stem, suffix)
+                return self.dirpath / name
+            for idx in range(2, 10000):
+                name = f"{stem}_{idx}{suffix}"
+                if name not in self._used:
+                    self._used.add(name)
+                    self._stems[name] = (stem, suffix)
+                    return self.dirpath / name
+        raise RuntimeError(f"Could not allocate unique path for {self.dirpath / (stem + suffix)}")
+
+    def reallocate(self, name: str) -> Path:
+        """Replace a handed-out name that another process created on disk meanwhile.
+
+        The taken name stays reserved; the replacement continues its numbering.
+        """
+        with self._lock:
+            stem, suffix = self._stems.get(name) or (Path(name).stem, Path(name).suffix)
+        return self.allocate(stem, suffix)
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            self._used.discard(name)
+            self._stems.pop(name, None)
+
+
+_OUTPUT_NAMES: Dict[Path, OutputNames] = {}
+_OUTPUT_NAMES_LOCK = threading.Lock()
+
+
+def output_names(dirpath: Path) -> OutputNames:
+    with _OUTPUT_NAMES_LOCK:
+        names = _OUTPUT_NAMES.get(dirpath)
+        if names is None:
+            names = _OUTPUT_NAMES[dirpath] = OutputNames(dirpath)
+        return names
+
+
 def unique_path(path: Path) -> Path:
-    if not path.exists():
-        return path
-    stem = path.stem
-    suffix = path.suffix
-    parent = path.parent
-    for idx in range(2, 10000):
-        candidate = parent / f"{stem}_{idx}{suffix}"
-        if not candidate.exists():
-            return candidate
-    raise RuntimeError(f"Could not allocate unique path for {path}")
-
-
-def attempt_download(candidate_url: str, out_path: Path, timeout: int) -> Tuple[bool, str, Optional[str]]:
+    return output_names(path.parent).allocate(path.stem, path.suffix)
+
+
+def release_path(path: Path) -> None:
+    """Return a unique_path() reservation that was never written to."""
+    output_names(path.parent).release(path.name)
+
+
+class _DownloadRace:
+    """Lets concurrent candidate downloads agree on a single winner for one output path."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.won = threading.Event()
+        self.path: Optional[Path] = None
+
+    def publish(self, tmp_path: Path, out_path: Path) -> bool:
+        with self.lock:
+            if self.won.is_set():
+                return False
+            # Linked, not replaced: out_path may exist if another run shares outdir.
+            self.path = move_into_place(tmp_path, out_path)
+            self.won.set()
+            return True
+
+
+def stream_pdf(resp: Any, head: bytes, out_path: Path, race: _DownloadRace) -> bool:
+    """Copy a PDF response body to a temp file next to out_path, then move it into place."""
+    fd, tmp_name = tempfile.mkstemp(prefix=".download_", suffix=".part", dir=out_path.parent)
+    tmp_path = Path(tmp_name)
     try:
-        data, content_type, final_url = fetch_url_bytes(candidate_url, timeout)
+        with os.fdopen(fd, "wb") as f:
+            f.write(head)
+            while True:
+                if race.won.is_set():
+                    return False
+                chunk = resp.read(STREAM_CHUNK)
+                if not chunk:
+                    break
+                f.write(chunk)
+        return race.publish(tmp_path, out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def scan_html_response(resp: Any, head: bytes, limit: int) -> Optional[str]:
+    """Read an HTML body only until the PDF link is found (or limit bytes)."""
+    scanner = PdfLinkScanner()
+    size = len(head)
+    done = scanner.feed(head)
+    while not done and size < limit:
+        chunk = resp.read(min(HTML_SCAN_CHUNK, limit - size))
+        if not chunk:
+            break
+        size += len(chunk)
+        done = scanner.feed(chunk)
+    return scanner.result()
+
+
+def fetch_candidate(
+    url: str,
+    out_path: Path,
+    timeout: int,
+    race: _DownloadRace,
+    scan_html: bool = True,
+) -> Tuple[str, Optional[str], str, str]:
+    """Fetch url, streaming a PDF body straight to out_path.
+
+    Returns (outcome, pdf_link, content_type, final_url) where outcome is "pdf",
+    "superseded" or "other"; pdf_link is the link discovered in an HTML body
+    (only looked for with scan_html). Bodies of other content types are never
+    read past the first few bytes.
+    """
+    headers = {
+        "User-Agent": USER_AGENT,
+        "Accept": "application/pdf, text/html;q=0.9, */*;q=0.8",
+    }
+    with open_url(url, headers=headers, timeout=timeout) as resp:
+        content_type = resp.headers.get_content_type() if resp.headers else ""
+        final_url = resp.url
+        if content_type.lower().startswith(_NON_DOCUMENT_TYPE_PREFIXES):
+            return "other", None, content_type, final_url
+        head = resp.read(4)
+        if is_pdf(head, content_type):
+            outcome = "pdf" if stream_pdf(resp, head, out_path, race) else "superseded"
+            return outcome, None, content_type, final_url
+        if not scan_html or "html" not in content_type.lower():
+            return "other", None, content_type, final_url
+        return "other", scan_html_response(resp, head, MAX_HTML_BYTES), content_type, final_url
+
+
+def attempt_download(
+    candidate_url: str,
+    out_path: Path,
+    timeout: int,
+    race: _DownloadRace,
+) -> Tuple[bool, str, Optional[str]]:
+    try:
+        outcome, discovered, content_type, final_url = fetch_candidate(
+            candidate_url, out_path, timeout, race
+        )
     except Exception as exc:  # noqa: BLE001
         return False, candidate_url, f"request_error: {exc}"
 
-    if is_pdf(data, content_type):
-        out_path.write_bytes(data)
+    if outcome == "pdf":
         return True, final_url, None
+    if outcome == "superseded":
+        return False, final_url, "superseded_by_other_candidate"
 
     if "html" not in (content_type or "").lower():
         return False, final_url, f"non_pdf_content_type: {content_type}"
 
-    html_text = data.decode("utf-8", "ignore")
-    discovered = maybe_extract_pdf_url_from_html(html_text)
     if not discovered:
         return False, final_url, "html_without_pdf_link"
 
+    if race.won.is_set():
+        return False, final_url, "superseded_by_other_candidate"
+
     discovered_url = urllib.parse.urljoin(final_url, discovered)
     try:
-        data2, content_type2, final_url2 = fetch_url_bytes(discovered_url, timeout)
+        outcome2, _, content_type2, final_url2 = fetch_candidate(
+            discovered_url, out_path, timeout, race, scan_html=False
+        )
     except Exception as exc:  # noqa: BLE001
         return False, discovered_url, f"followup_request_error: {exc}"
 
-    if not is_pdf(data2, content_type2):
-        return False, final_url2, f"followup_non_pdf_content_type: {content_type2}"
+    if outcome2 == "pdf":
+        return True, final_url2, None
+    if outcome2 == "superseded":
+        return False, final_url2, "superseded_by_other_candidate"
+    return False, final_url2, f"followup_non_pdf_content_type: {content_type2}"
 
-    out_path.write_bytes(data2)
-    return True, final_url2, None
 
+_CANDIDATE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_CANDIDATE_EXECUTOR_LOCK = threading.Lock()
 
-def resolve_scihub_command(command_override: Optional[str]) -> Tuple[Optional[List[str]], Optional[str]]:
+
+def candidate_executor() -> ThreadPoolExecutor:
+    global _CANDIDATE_EXECUTOR
+    with _CANDIDATE_EXECUTOR_LOCK:
+        if _CANDIDATE_EXECUTOR is None:
+            _CANDIDATE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=CANDIDATE_WORKERS, thread_name_prefix="candidate"
+            )
+        return _CANDIDATE_EXECUTOR
+
+
+def download_first_pdf(
+    candidates: List[str],
+    out_path: Path,
+    timeout: int,
+) -> Tuple[Optional[Path], str, Optional[str]]:
+    """Try candidate URLs concurrently and keep the first one that yields a PDF.
+
+    Returns (path, resolved_url, error); path is where the PDF was written,
+    normally out_path, or None on failure. At most CANDIDATE_CONCURRENCY
+    candidates of one DOI are in flight at once. On failure, the outcome of
+    the last candidate is reported, matching the order Unpaywall listed them in.
+    """
+    race = _DownloadRace()
+    if len(candidates) == 1:
+        ok, resolved_url, error = attempt_download(candidates[0], out_path, timeout, race)
+        return race.path if ok else None, resolved_url, error
+
+    executor = candidate_executor()
+    remaining = iter(enumerate(candidates))
+    pending: Dict[Future, int] = {}
+    outcomes: Dict[int, Tuple[bool, str, Optional[str]]] = {}
+
+    def submit_next() -> None:
+        nxt = next(remaining, None)
+        if nxt is not None:
+            idx, url = nxt
+            pending[executor.submit(attempt_download, url, out_path, timeout, race)] = idx
+
+    for _ in range(CANDIDATE_CONCURRENCY):
+        submit_next()
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = outcomes[pending.pop(future)] = future.result()
+                if outcome[0]:
+                    return race.path, outcome[1], None
+                submit_next()
+        _, resolved_url, error = outcomes[len(candidates) - 1]
+        return None, resolved_url, error
+    finally:
+        # Losers still in flight see race.won and never touch out_path.
+        for future in pending:
+            future.cancel()
+
+
+_which = functools.lru_cache(maxsize=None)(shutil.which)
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_scihub_command(
+    command_override: Optional[str],
+) -> Tuple[Optional[Tuple[str, ...]], Optional[str]]:
     if command_override:
-        cmd = shlex.split(command_override)
+        cmd = tuple(shlex.split(command_override))
         if not cmd:
             return None, "empty_scihub_cmd"
         first = cmd[0]
@@ -245,19 +646,25 @@ def resolve_scihub_command(command_override: Optional[str]) -> Tuple[Optional[Li
             if not Path(first).exists():
                 return None, f"scihub_cmd_not_found: {first}"
             return cmd, None
-        if shutil.which(first):
+        if _which(first):
             return cmd, None
         return None, f"scihub_cmd_not_found: {first}"
 
-    if shutil.which("scihub-cli"):
-        return ["scihub-cli"], None
+    if _which("scihub-cli"):
+        return ("scihub-cli",), None
 
-    if shutil.which("uvx"):
-        return UVX_FALLBACK_CMD.copy(), None
+    if _which("uvx"):
+        return tuple(UVX_FALLBACK_CMD), None
 
     return None, "scihub_cli_not_found (install with: uv tool install git+https://github.com/Oxidane-bot/scihub-cli.git)"
 
 
+def resolve_scihub_command(command_override: Optional[str]) -> Tuple[Optional[List[str]], Optional[str]]:
+    # Resolution is cached per override; hand out a fresh list so callers may mutate it.
+    cmd, error = _resolve_scihub_command(command_override)
+    return (list(cmd) if cmd is not None else None), error
+
+
 def is_valid_pdf_file(path: Path) -> bool:
     try:
         with path.open("rb") as f:
@@ -266,12 +673,62 @@ def is_valid_pdf_file(path: Path) -> bool:
         return False
 
 
+def iter_pdf_files(root: Path) -> Iterator["os.DirEntry[str]"]:
+    """Yield every *.pdf under root, walking it once with os.scandir."""
+    stack = [str(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(".pdf") and entry.is_file():
+                    yield entry
+
+
 def find_best_pdf(root: Path) -> Optional[Path]:
-    pdfs = [p for p in root.rglob("*.pdf") if p.is_file()]
-    if not pdfs:
-        return None
-    pdfs.sort(key=lambda p: p.stat().st_size, reverse=True)
-    return pdfs[0]
+    """Return the largest *.pdf under root."""
+    best: Optional[str] = None
+    best_size = -1
+    for entry in iter_pdf_files(root):
+        size = entry.stat().st_size
+        if size > best_size:
+            best, best_size = entry.path, size
+    return Path(best) if best is not None else None
+
+
+def link_into_place(src: Path, target: Path) -> Path:
+    """Hard-link src at the unique_path() target without overwriting anything.
+
+    The name registry only knows the directory as it was first listed, so a
+    file another process created since then shows up here as EEXIST; the next
+    free name is used instead. Returns the path actually written.
+    """
+    names = output_names(target.parent)
+    while True:
+        try:
+            os.link(src, target)
+            return target
+        except FileExistsError:
+            target = names.reallocate(target.name)
+
+
+def move_into_place(src: Path, target: Path) -> Path:
+    try:
+        return link_into_place(src, target)
+    except OSError as exc:
+        if exc.errno == errno.EXDEV:
+            shutil.move(str(src), str(target))
+        elif exc.errno in _NO_HARDLINK_ERRNOS:
+            # No hard links on this filesystem (e.g. FAT, some network shares);
+            # a rename still avoids copying the bytes.
+            os.replace(src, target)
+        else:
+            raise
+        return target
 
 
 def compact_log_tail(text: str, max_lines: int = 6) -> str:
@@ -282,75 +739,213 @@ def compact_log_tail(text: str, max_lines: int = 6) -> str:
     return " | ".join(tail)
 
 
+def run_scihub_cli(
+    fallback: FallbackConfig,
+    dois: List[str],
+    workdir: Path,
+    parallel: int,
+    timeout: int,
+) -> Tuple[Path, Optional["subprocess.CompletedProcess[str]"], Optional[str]]:
+    """Run scihub-cli for dois inside workdir; returns (output_dir, process, error)."""
+    input_file = workdir / "input.txt"
+    input_file.write_text("".join(f"{doi}\n" for doi in dois), encoding="utf-8")
+
+    out_dir = workdir / "out"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    cmd = list(fallback.command or [])
+    cmd.extend(
+        [
+            str(input_file),
+            "-o",
+            str(out_dir),
+            "-t",
+            str(max(15, fallback.timeout // 3)),
+            "-r",
+            "2",
+            "-p",
+            str(parallel),
+        ]
+    )
+    if fallback.email:
+        cmd.extend(["--email", fallback.email])
+
+    try:
+        proc = subprocess.run(
+            cmd,
+            # Interleave stderr into stdout at the OS level; callers scan one log.
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        return out_dir, None, f"scihub_cli_timeout_after_{timeout}s"
+    except Exception as exc:  # noqa: BLE001
+        return out_dir, None, f"scihub_cli_exec_error: {exc}"
+    return out_dir, proc, None
+
+
+def log_lines_for(logs: str, doi: str) -> str:
+    """Return the scihub-cli log lines that mention doi (batch runs interleave DOIs)."""
+    needle = doi.lower()
+    return "\n".join(ln for ln in logs.splitlines() if needle in ln.lower())
+
+
+def scihub_download_url(logs: str, doi: Optional[str] = None) -> Optional[str]:
+    if doi:
+        logs = log_lines_for(logs, doi)
+    m = _SCIHUB_URL_RE.search(logs)
+    return m.group(1) if m else None
+
+
+def no_pdf_error(proc: "subprocess.CompletedProcess[str]", logs: str, doi: Optional[str] = None) -> str:
+    if doi:
+        # In batch runs, prefer the lines that talk about this DOI.
+        logs = log_lines_for(logs, doi) or logs
+    err_tail = compact_log_tail(logs) or "no_detail"
+    if proc.returncode != 0:
+        return f"scihub_cli_no_pdf_exit_{proc.returncode}: {err_tail}"
+    return f"scihub_cli_no_pdf: {err_tail}"
+
+
 def attempt_scihub_fallback(
     doi: str,
     outdir: Path,
     filename_base: str,
     fallback: FallbackConfig,
-) -> Tuple[bool, Optional[str], Optional[str], Optional[str]]:
+) -> FallbackOutcome:
     if fallback.command is None:
         return False, None, None, fallback.setup_error or "scihub_fallback_not_available"
 
-    with tempfile.TemporaryDirectory(prefix="scihub_fallback_") as td:
-        tmp = Path(td)
-        input_file = tmp / "input.txt"
-        input_file.write_text(f"{doi}\n", encoding="utf-8")
-
-        tmp_out = tmp / "out"
-        tmp_out.mkdir(parents=True, exist_ok=True)
-
-        cmd = list(fallback.command)
-        cmd.extend(
-            [
-                str(input_file),
-                "-o",
-                str(tmp_out),
-                "-t",
-                str(max(15, fallback.timeout // 3)),
-                "-r",
-                "2",
-                "-p",
-                "1",
-            ]
-        )
-        if fallback.email:
-            cmd.extend(["--email", fallback.email])
+    # Scratch space lives inside outdir so the result can be linked into place
+    # on the same filesystem instead of copied.
+    with tempfile.TemporaryDirectory(prefix=".scihub_fallback_", dir=outdir) as td:
+        timeout = max(60, fallback.timeout)
+        tmp_out, proc, run_error = run_scihub_cli(fallback, [doi], Path(td), 1, timeout)
+        if proc is None:
+            return False, None, None, run_error
 
-        try:
-            proc = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=max(60, fallback.timeout),
-                check=False,
-            )
-        except subprocess.TimeoutExpired:
-            return False, None, None, f"scihub_cli_timeout_after_{max(60, fallback.timeout)}s"
-        except Exception as exc:  # noqa: BLE001
-            return False, None, None, f"scihub_cli_exec_error: {exc}"
-
-        logs = "\n".join([proc.stdout or "", proc.stderr or ""])
+        logs = proc.stdout or ""
         best_pdf = find_best_pdf(tmp_out)
         if not best_pdf:
-            err_tail = compact_log_tail(logs)
-            if proc.returncode != 0:
-                return (
-                    False,
-                    None,
-                    None,
-                    f"scihub_cli_no_pdf_exit_{proc.returncode}: {err_tail or 'no_detail'}",
-                )
-            return False, None, None, f"scihub_cli_no_pdf: {err_tail or 'no_detail'}"
+            return False, None, None, no_pdf_error(proc, logs)
 
         if not is_valid_pdf_file(best_pdf):
             return False, None, None, "scihub_cli_invalid_pdf_header"
 
         target = unique_path(outdir / f"{filename_base}.pdf")
-        shutil.copy2(best_pdf, target)
+        try:
+            target = move_into_place(best_pdf, target)
+        except OSError as exc:
+            release_path(target)
+            return False, None, None, f"scihub_move_error: {exc}"
+
+        return True, str(target), scihub_download_url(logs), None
+
+
+def match_pdfs_to_dois(dois: List[str], pdfs: List[Path]) -> Dict[str, Path]:
+    """Pair each DOI with the output file whose name contains it (ignoring punctuation/case)."""
+    stems = {pdf: _NON_ALNUM_RE.sub("", pdf.stem.lower()) for pdf in pdfs}
+    matched: Dict[str, Path] = {}
+    # Longest keys first so 10.1/12 cannot claim the file that belongs to 10.1/123.
+    for doi in sorted(dois, key=len, reverse=True):
+        key = _NON_ALNUM_RE.sub("", doi.lower())
+        hits = [pdf for pdf, stem in stems.items() if key and key in stem]
+        if hits:
+            best = max(hits, key=lambda p: p.stat().st_size)
+            matched[doi] = best
+            del stems[best]
+    return matched
+
+
+def attempt_scihub_fallback_batch(
+    items: List[Tuple[str, str]],
+    outdir: Path,
+    fallback: FallbackConfig,
+) -> Dict[str, FallbackOutcome]:
+    """Run scihub-cli once for many (doi, filename_base) pairs.
+
+    Output files are mapped back to DOIs by filename only. A DOI without a
+    matching file is retried on its own whenever unclaimed PDFs remain, since
+    one of them may be its paper (or a supplement of another DOI). If
+    scihub-cli names files by title, nothing matches and every DOI is
+    downloaded twice: once in the batch, then again alone.
+    """
+    if fallback.command is None or len(items) <= 1:
+        return {doi: attempt_scihub_fallback(doi, outdir, base, fallback) for doi, base in items}
+
+    outcomes: Dict[str, FallbackOutcome] = {}
+    retry: List[Tuple[str, str]] = []
+    parallel = min(SCIHUB_BATCH_PARALLELISM, len(items))
+    timeout = max(60, fallback.timeout) * -(-len(items) // parallel)
+
+    with tempfile.TemporaryDirectory(prefix=".scihub_fallback_", dir=outdir) as td:
+        tmp_out, proc, run_error = run_scihub_cli(fallback, [doi for doi, _ in items], Path(td), parallel, timeout)
+        logs = (proc.stdout or "") if proc is not None else ""
+
+        pdfs = [Path(entry.path) for entry in iter_pdf_files(tmp_out)]
+        matched = match_pdfs_to_dois([doi for doi, _ in items], pdfs)
+        unclaimed = [pdf for pdf in pdfs if pdf not in matched.values()]
+
+        for doi, base in items:
+            pdf = matched.get(doi)
+            if pdf is None:
+                if unclaimed and proc is not None:
+                    retry.append((doi, base))
+                elif proc is not None:
+                    outcomes[doi] = (False, None, None, no_pdf_error(proc, logs, doi))
+                else:
+                    outcomes[doi] = (False, None, None, run_error)
+                continue
+            if not is_valid_pdf_file(pdf):
+                outcomes[doi] = (False, None, None, "scihub_cli_invalid_pdf_header")
+                continue
+            target = unique_path(outdir / f"{base}.pdf")
+            try:
+                target = move_into_place(pdf, target)
+            except OSError as exc:
+                release_path(target)
+                outcomes[doi] = (False, None, None, f"scihub_move_error: {exc}")
+                continue
+            outcomes[doi] = (True, str(target), scihub_download_url(logs, doi), None)
+
+    for doi, base in retry:
+        outcomes[doi] = attempt_scihub_fallback(doi, outdir, base, fallback)
+    return outcomes
+
+
+def filename_base_for(doi: str, title: Optional[str]) -> str:
+    return safe_filename(title or "", default=safe_filename(doi.replace("/", "_"), "paper"))
+
+
+def needs_fallback(result: Dict[str, Any], fallback: FallbackConfig) -> bool:
+    if fallback.command is None:
+        return False
+    if fallback.mode == "force":
+        return True
+    return fallback.mode == "auto" and result["status"] != "downloaded"
 
-        m = re.search(r"Download URL:\s*(\S+)", logs)
-        resolved = m.group(1) if m else None
-        return True, str(target), resolved, None
+
+def apply_fallback_outcome(result: Dict[str, Any], outcome: FallbackOutcome) -> Dict[str, Any]:
+    ok, path, resolved, fallback_error = outcome
+    result["fallback_attempted"] = True
+    if ok:
+        result["status"] = "downloaded"
+        result["path"] = path
+        # Never report the Unpaywall URL that failed as the source of this PDF.
+        result["resolved_url"] = resolved
+        result["error"] = None
+        result["download_method"] = "scihub_fallback"
+        result["fallback_error"] = None
+        return result
+
+    result["status"] = "failed"
+    result["error"] = result.get("primary_error") or fallback_error
+    result["fallback_error"] = fallback_error
+    result["download_method"] = None
+    return result
 
 
 def process_doi(
@@ -359,7 +954,18 @@ def process_doi(
     outdir: Path,
     timeout: int,
     fallback: FallbackConfig,
+    cache: Optional[JsonFileCache] = None,
+    lookup: Optional[LookupResult] = None,
+    defer_fallback: bool = False,
 ) -> Dict[str, Any]:
+    """Download one DOI; pass lookup to reuse an Unpaywall result fetched elsewhere.
+
+    outdir is used as given for every path joined onto it; callers that run
+    many DOIs should pass it already resolved.
+
+    With defer_fallback, scihub-cli is not run here; callers batch it through
+    attempt_scihub_fallback_batch for every result where needs_fallback() holds.
+    """
     result: Dict[str, Any] = {
         "doi": doi,
         "status": "failed",
@@ -375,21 +981,11 @@ def process_doi(
         "fallback_error": None,
     }
 
-    filename_base = safe_filename(doi.replace("/", "_"), "paper")
-
     if fallback.mode == "force":
-        result["fallback_attempted"] = True
-        ok, path, resolved, fallback_error = attempt_scihub_fallback(doi, outdir, filename_base, fallback)
-        if ok:
-            result["status"] = "downloaded"
-            result["path"] = path
-            result["resolved_url"] = resolved
-            result["download_method"] = "scihub_fallback"
+        if defer_fallback and fallback.command is not None:
             return result
-        result["status"] = "failed"
-        result["error"] = fallback_error
-        result["fallback_error"] = fallback_error
-        return result
+        outcome = attempt_scihub_fallback(doi, outdir, filename_base_for(doi, None), fallback)
+        return apply_fallback_outcome(result, outcome)
 
     if not email:
         result["status"] = "failed"
@@ -399,26 +995,15 @@ def process_doi(
         return result
 
     primary_status = "failed"
-    primary_error = None
-
-    try:
-        record = unpaywall_lookup(doi, email, timeout)
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", "ignore")
-        primary_status = "failed"
-        primary_error = f"unpaywall_http_{exc.code}: {body}"
-        record = None
-    except Exception as exc:  # noqa: BLE001
-        primary_status = "failed"
-        primary_error = f"unpaywall_error: {exc}"
-        record = None
+    if lookup is None:
+        lookup = lookup_doi(doi, email, timeout, cache)
+    record, primary_error = lookup
 
     if record is not None:
         title = record.get("title") or ""
         is_oa = bool(record.get("is_oa"))
         result["title"] = title
         result["is_oa"] = is_oa
-        filename_base = safe_filename(title, default=filename_base)
 
         if not is_oa:
             primary_status = "no_oa"
@@ -427,20 +1012,21 @@ def process_doi(
             if not candidates:
                 primary_status = "no_download_url"
             else:
-                out_path = unique_path(outdir / f"{filename_base}.pdf")
-                for candidate in candidates:
-                    ok, resolved_url, error = attempt_download(candidate, out_path, timeout)
-                    if ok:
-                        result["status"] = "downloaded"
-                        result["resolved_url"] = resolved_url
-                        result["path"] = str(out_path)
-                        result["error"] = None
-                        result["download_method"] = "unpaywall"
-                        result["primary_status"] = "downloaded"
-                        result["primary_error"] = None
-                        return result
-                    primary_error = error
+                out_path = unique_path(outdir / f"{filename_base_for(doi, title)}.pdf")
+                pdf_path, resolved_url, error = download_first_pdf(candidates, out_path, timeout)
+                if pdf_path is not None:
+                    result["status"] = "downloaded"
                     result["resolved_url"] = resolved_url
+                    result["path"] = str(pdf_path)
+                    result["error"] = None
+                    result["download_method"] = "unpaywall"
+                    result["primary_status"] = "downloaded"
+                    result["primary_error"] = None
+                    return result
+                primary_error = error
+                result["resolved_url"] = resolved_url
+                # Nothing was written; let the fallback reuse the name.
+                release_path(out_path)
                 primary_status = "failed"
 
     result["primary_status"] = primary_status
@@ -458,22 +1044,101 @@ def process_doi(
         result["fallback_error"] = fallback.setup_error
         return result
 
-    result["fallback_attempted"] = True
-    ok, path, resolved, fallback_error = attempt_scihub_fallback(doi, outdir, filename_base, fallback)
-    if ok:
-        result["status"] = "downloaded"
-        result["path"] = path
-        result["resolved_url"] = resolved or result.get("resolved_url")
-        result["error"] = None
-        result["download_method"] = "scihub_fallback"
-        result["fallback_error"] = None
+    result["status"] = primary_status
+    result["error"] = primary_error
+    if defer_fallback:
         return result
 
-    result["status"] = "failed"
-    result["error"] = primary_error or fallback_error
-    result["fallback_error"] = fallback_error
-    result["download_method"] = None
-    return result
+    outcome = attempt_scihub_fallback(doi, outdir, filename_base_for(doi, result["title"]), fallback)
+    return apply_fallback_outcome(result, outcome)
+
+
+def process_dois(
+    dois: List[str],
+    email: Optional[str],
+    outdir: Path,
+    timeout: int,
+    fallback: FallbackConfig,
+    cache: Optional[JsonFileCache],
+    download_workers: int,
+    lookup_workers: int = LOOKUP_CONCURRENCY,
+    defer_fallback: bool = False,
+) -> List[Dict[str, Any]]:
+    """Run Unpaywall lookups and downloads as two stages joined by a bounded queue.
+
+    Lookups are small and fast, downloads large and slow, so each stage gets its
+    own worker count. Results come back in input order.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(dois)
+    errors: List[BaseException] = []
+    lookup_email = email if fallback.mode != "force" else None
+    lookup_q: "queue.Queue[Optional[Tuple[int, str]]]" = queue.Queue(maxsize=128)
+    download_q: "queue.Queue[Optional[Tuple[int, str, Optional[LookupResult]]]]" = queue.Queue(maxsize=64)
+
+    def lookup_worker() -> None:
+        while True:
+            item = lookup_q.get()
+            if item is None:
+                return
+            idx, doi = item
+            lookup = lookup_doi(doi, lookup_email, timeout, cache) if lookup_email else None
+            download_q.put((idx, doi, lookup))
+
+    def download_worker() -> None:
+        while True:
+            item = download_q.get()
+            if item is None:
+                return
+            idx, doi, lookup = item
+            try:
+                results[idx] = process_doi(
+                    doi, email, outdir, timeout, fallback, cache, lookup, defer_fallback
+                )
+            except Exception as exc:  # noqa: BLE001
+                # Keep draining so the lookup stage never blocks; re-raised below.
+                errors.append(exc)
+
+    lookup_threads = [
+        threading.Thread(target=lookup_worker, daemon=True)
+        for _ in range(max(1, min(lookup_workers, len(dois))))
+    ]
+    download_threads = [
+        threading.Thread(target=download_worker, daemon=True)
+        for _ in range(max(1, min(download_workers, len(dois))))
+    ]
+    for thread in lookup_threads + download_threads:
+        thread.start()
+
+    for item in enumerate(dois):
+        lookup_q.put(item)
+    for _ in lookup_threads:
+        lookup_q.put(None)
+    for thread in lookup_threads:
+        thread.join()
+    for _ in download_threads:
+        download_q.put(None)
+    for thread in download_threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return [r for r in results if r is not None]
+
+
+def write_json_summary(summary: Dict[str, Any], out: Optional[str]) -> None:
+    """Serialize summary to out (or stdout) as bytes, skipping the text layer."""
+    data = json_dumps(summary, indent=True)
+    stdout_buffer = getattr(sys.stdout, "buffer", None)
+    if out:
+        Path(out).write_bytes(data)
+        print(out)
+    elif stdout_buffer is not None:
+        sys.stdout.flush()
+        stdout_buffer.write(data + b"\n")
+        stdout_buffer.flush()
+    else:
+        # stdout replaced by a text-only stream (e.g. redirected in-process).
+        sys.stdout.write(data.decode("utf-8") + "\n")
 
 
 def print_text_summary(summary: Dict[str, Any]) -> None:
@@ -484,6 +1149,8 @@ def print_text_summary(summary: Dict[str, Any]) -> None:
         print(f"SciHub command: {summary['scihub_fallback_command']}")
     if summary.get("scihub_fallback_setup_error"):
         print(f"SciHub setup error: {summary['scihub_fallback_setup_error']}")
+    if summary.get("invalid_dois"):
+        print(f"Invalid DOIs skipped: {', '.join(summary['invalid_dois'])}")
     print()
     for idx, item in enumerate(summary["results"], 1):
         print(f"{idx}. DOI: {item['doi']}")
@@ -509,7 +1176,10 @@ def main() -> int:
 
     dois = load_dois(args)
     if not dois:
-        print("No DOI provided. Use --doi or --doi-file.", file=sys.stderr)
+        if args.invalid_dois:
+            print("No valid DOI provided.", file=sys.stderr)
+        else:
+            print("No DOI provided. Use --doi or --doi-file.", file=sys.stderr)
         return 2
 
     outdir = Path(args.outdir)
@@ -528,7 +1198,30 @@ def main() -> int:
         setup_error=fallback_error,
     )
 
-    results = [process_doi(doi, email, outdir, args.timeout, fallback_cfg) for doi in dois]
+    cache = None if args.no_cache else unpaywall_cache(args.cache_ttl)
+
+    results = process_dois(
+        dois,
+        email,
+        outdir,
+        args.timeout,
+        fallback_cfg,
+        cache,
+        download_workers=args.concurrency,
+        lookup_workers=args.lookup_concurrency,
+        defer_fallback=True,
+    )
+
+    # One scihub-cli run for every DOI that still needs it, instead of one per DOI.
+    pending = [r for r in results if needs_fallback(r, fallback_cfg)]
+    if pending:
+        outcomes = attempt_scihub_fallback_batch(
+            [(r["doi"], filename_base_for(r["doi"], r["title"])) for r in pending],
+            outdir,
+            fallback_cfg,
+        )
+        for r in pending:
+            apply_fallback_outcome(r, outcomes[r["doi"]])
 
     summary = {
         "email": email,
@@ -536,16 +1229,12 @@ def main() -> int:
         "scihub_fallback_mode": args.scihub_fallback,
         "scihub_fallback_command": " ".join(fallback_cmd) if fallback_cmd else None,
         "scihub_fallback_setup_error": fallback_error,
+        "invalid_dois": args.invalid_dois,
         "results": results,
     }
 
     if args.json:
-        output = json.dumps(summary, ensure_ascii=False, indent=2)
-        if args.out:
-            Path(args.out).write_text(output, encoding="utf-8")
-            print(args.out)
-        else:
-            print(output)
+        write_json_summary(summary, args.out)
     else:
         print_text_summary(summary)
 
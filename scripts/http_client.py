@@ -0,0 +1,237 @@
+"""Keep-alive HTTP client shared by the Scopus and Unpaywall scripts."""
+
+import atexit
+import gzip
+import http.client
+import io
+import json
+import ssl
+import string
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON parsing and serialization when installed
+    orjson = None
+
+MAX_REDIRECTS = 10
+# Hosts each thread keeps a connection open to; the least recently used is closed beyond this.
+MAX_HOSTS_PER_THREAD = 8
+# Error bodies up to this size are read eagerly so the connection can be reused.
+MAX_DRAINED_ERROR_BODY = 64 * 1024
+# Send with JSON API requests; read_body/read_json undo the encoding.
+ACCEPT_COMPRESSED = "gzip, deflate"
+_REDIRECT_CODES = {301, 302, 303, 307, 308}
+
+Connection = Union[http.client.HTTPConnection, http.client.HTTPSConnection]
+
+
+class PooledResponse(http.client.HTTPResponse):
+    """HTTPResponse that remembers whether it was closed before its body was drained."""
+
+    abandoned = False
+    url = ""
+
+    def close(self) -> None:
+        if self.fp is not None:
+            self.abandoned = True
+        super().close()
+
+
+class ConnectionPool:
+    """Per-thread persistent connections keyed by (scheme, host).
+
+    A connection is reused only when the previous response on it was read to the
+    end; anything else (still open, closed early, server said close) gets a fresh
+    connection so a half-read body can never leak into the next request. Each
+    thread keeps at most MAX_HOSTS_PER_THREAD hosts, evicting the least recently
+    used, so crawling many publisher hosts cannot pile up idle sockets.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._ssl_context = ssl.create_default_context()
+        self._all: "weakref.WeakSet[Connection]" = weakref.WeakSet()
+        self._all_lock = threading.Lock()
+
+    def _slots(self) -> "OrderedDict[Tuple[str, str], Tuple[Connection, Optional[PooledResponse]]]":
+        slots = getattr(self._local, "slots", None)
+        if slots is None:
+            slots = OrderedDict()
+            self._local.slots = slots
+        return slots
+
+    def _store(self, key: Tuple[str, str], conn: Connection, resp: PooledResponse) -> None:
+        slots = self._slots()
+        slots[key] = (conn, resp)
+        slots.move_to_end(key)
+        if len(slots) <= MAX_HOSTS_PER_THREAD:
+            return
+        for old_key in list(slots)[:-1]:
+            old_conn, old_resp = slots[old_key]
+            # A response this thread is still reading keeps its connection.
+            if old_resp is None or old_resp.isclosed():
+                del slots[old_key]
+                old_conn.close()
+                if len(slots) <= MAX_HOSTS_PER_THREAD:
+                    break
+
+    def _new_connection(self, scheme: str, netloc: str, timeout: float) -> Connection:
+        conn: Connection
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(netloc, timeout=timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(netloc, timeout=timeout)
+        conn.response_class = PooledResponse
+        with self._all_lock:
+            self._all.add(conn)
+        return conn
+
+    def _connection(self, scheme: str, netloc: str, timeout: float) -> Tuple[Connection, bool]:
+        slots = self._slots()
+        slot = slots.get((scheme, netloc))
+        if slot is not None:
+            slots.move_to_end((scheme, netloc))
+            conn, last = slot
+            if last is None or (last.isclosed() and not last.abandoned):
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            conn.close()
+        return self._new_connection(scheme, netloc, timeout), False
+
+    def _send(self, method: str, url: str, headers: Dict[str, str], timeout: float) -> PooledResponse:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"}:
+            raise urllib.error.URLError(f"unsupported URL scheme: {parts.scheme or 'none'}")
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+
+        conn, reused = self._connection(scheme, parts.netloc, timeout)
+        try:
+            try:
+                conn.request(method, target, headers=headers)
+                resp = conn.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                # Servers drop idle keep-alive sockets; retry once on a fresh one.
+                if not reused:
+                    raise
+                conn.close()
+                conn = self._new_connection(scheme, parts.netloc, timeout)
+                conn.request(method, target, headers=headers)
+                resp = conn.getresponse()
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            self._slots().pop((scheme, parts.netloc), None)
+            raise urllib.error.URLError(exc) from exc
+
+        resp.url = url
+        self._store((scheme, parts.netloc), conn, resp)
+        return resp
+
+    def open(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30,
+        method: str = "GET",
+    ) -> http.client.HTTPResponse:
+        """Issue a request, following redirects. Mirrors urlopen's error contract."""
+        headers = dict(headers or {})
+        host = urllib.parse.urlsplit(url).hostname or ""
+        proxies = urllib.request.getproxies()
+        if (proxies.get("http") or proxies.get("https")) and not urllib.request.proxy_bypass(host):
+            # Keep urllib's proxy handling rather than reimplementing CONNECT tunnels.
+            req = urllib.request.Request(url, headers=headers, method=method)
+            return urllib.request.urlopen(req, timeout=timeout)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self._send(method, url, headers, timeout)
+            location = resp.getheader("Location")
+            if resp.status in _REDIRECT_CODES and location:
+                resp.read()
+                resp.close()
+                url = _quote_location(urllib.parse.urljoin(url, location))
+                if resp.status == 303 and method != "HEAD":
+                    method = "GET"
+                continue
+            if resp.status >= 400:
+                body: Any = resp
+                if resp.length is not None and resp.length <= MAX_DRAINED_ERROR_BODY:
+                    body = io.BytesIO(resp.read())
+                raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, body)
+            return resp
+
+        raise urllib.error.HTTPError(url, resp.status, "too many redirects", resp.headers, None)
+
+    def close(self) -> None:
+        with self._all_lock:
+            conns, self._all = list(self._all), weakref.WeakSet()
+        for conn in conns:
+            conn.close()
+
+
+def _quote_location(url: str) -> str:
+    # Same normalisation urllib applies to redirect targets with raw spaces/unicode.
+    parts = urllib.parse.urlsplit(url)
+    if not parts.path and parts.netloc:
+        parts = parts._replace(path="/")
+    return urllib.parse.quote(
+        urllib.parse.urlunsplit(parts), encoding="iso-8859-1", safe=string.punctuation
+    )
+
+
+_POOL = ConnectionPool()
+atexit.register(_POOL.close)
+
+
+def open_url(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 30,
+    method: str = "GET",
+) -> http.client.HTTPResponse:
+    return _POOL.open(url, headers=headers, timeout=timeout, method=method)
+
+
+def json_loads(data: bytes) -> Any:
+    """Parse JSON straight from bytes, with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes (indent: 2 spaces), with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+def read_body(resp: Any) -> bytes:
+    """Read a whole response (or HTTPError) body, undoing gzip/deflate transfer compression."""
+    data = resp.read()
+    encoding = (resp.headers.get("Content-Encoding") or "").strip().lower()
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(data)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header.
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+    return data
+
+
+def read_json(resp: http.client.HTTPResponse) -> Any:
+    return json_loads(read_body(resp))
@@ -5,12 +5,26 @@ import argparse
 import json
 import os
 import sys
+import urllib.error
 import urllib.parse
-import urllib.request
-from typing import Any, Dict, List
+from typing import Any, Dict, Mapping, Tuple
+
+from http_client import ACCEPT_COMPRESSED, open_url, read_body, read_json
 
 SCOPUS_SEARCH_URL = "https://api.elsevier.com/content/search/scopus"
 
+_ENTRY_FIELDS = (
+    "dc:title",
+    "prism:doi",
+    "prism:coverDate",
+    "prism:publicationName",
+    "citedby-count",
+    "dc:creator",
+    "eid",
+)
+# Backslash and double quote are the only characters special inside a quoted Scopus literal.
+_QUERY_ESCAPE = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -56,10 +70,17 @@ def quote_term(term: str) -> str:
 
 
 def escape_quotes(text: str) -> str:
-    return text.replace("\\", "\\\\").replace('"', '\\"')
+    return text.translate(_QUERY_ESCAPE)
 
 
 def scopus_request(api_key: str, query: str, count: int, start: int, sort: str) -> Dict[str, Any]:
+    return scopus_request_with_headers(api_key, query, count, start, sort)[0]
+
+
+def scopus_request_with_headers(
+    api_key: str, query: str, count: int, start: int, sort: str
+) -> Tuple[Dict[str, Any], Mapping[str, str]]:
+    """Like scopus_request, but also return the response headers (e.g. X-RateLimit-*)."""
     params = urllib.parse.urlencode(
         {
             "query": query,
@@ -69,22 +90,35 @@ def scopus_request(api_key: str, query: str, count: int, start: int, sort: str)
         }
     )
     url = f"{SCOPUS_SEARCH_URL}?{params}"
-    req = urllib.request.Request(
-        url,
-        headers={
-            "X-ELS-APIKey": api_key,
-            "Accept": "application/json",
-        },
-    )
+    headers = {
+        "X-ELS-APIKey": api_key,
+        "Accept": "application/json",
+        "Accept-Encoding": ACCEPT_COMPRESSED,
+    }
 
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            return json.loads(resp.read().decode("utf-8", "ignore"))
+        with open_url(url, headers=headers, timeout=30) as resp:
+            return read_json(resp), resp.headers
     except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", "ignore")
+        body = read_body(exc).decode("utf-8", "ignore")
         raise RuntimeError(f"Scopus API error HTTP {exc.code}: {body}") from exc
     except urllib.error.URLError as exc:
         raise RuntimeError(f"Network error: {exc}") from exc
+    except ValueError as exc:
+        raise RuntimeError(f"Invalid Scopus response: {exc}") from exc
+
+
+def build_entry(item: Dict[str, Any]) -> Dict[str, Any]:
+    title, doi, cover_date, source, cited_by, authors, eid = map(item.get, _ENTRY_FIELDS)
+    return {
+        "title": title or "",
+        "doi": doi or "N/A",
+        "year": (cover_date or "")[:4] or "N/A",
+        "source": source or "",
+        "cited_by": safe_int(cited_by),
+        "authors": authors or "",
+        "eid": eid or "",
+    }
 
 
 def extract_entries(raw: Dict[str, Any]) -> Dict[str, Any]:
@@ -92,22 +126,9 @@ def extract_entries(raw: Dict[str, Any]) -> Dict[str, Any]:
     total = int(results.get("opensearch:totalResults", "0") or "0")
     entries_raw = results.get("entry") or []
 
-    entries: List[Dict[str, Any]] = []
-    for item in entries_raw:
-        entry = {
-            "title": item.get("dc:title") or "",
-            "doi": item.get("prism:doi") or "N/A",
-            "year": (item.get("prism:coverDate") or "")[:4] or "N/A",
-            "source": item.get("prism:publicationName") or "",
-            "cited_by": safe_int(item.get("citedby-count")),
-            "authors": item.get("dc:creator") or "",
-            "eid": item.get("eid") or "",
-        }
-        entries.append(entry)
-
     return {
         "total": total,
-        "entries": entries,
+        "entries": [build_entry(item) for item in entries_raw],
     }
 
 
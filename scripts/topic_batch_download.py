@@ -2,24 +2,60 @@
 """Search Scopus by topic and download papers with quantity/freshness strategy."""
 
 import argparse
-import json
+import functools
+import itertools
 import os
+import re
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 if str(SCRIPT_DIR) not in sys.path:
     sys.path.insert(0, str(SCRIPT_DIR))
 
 from download_open_access import (  # noqa: E402
+    CACHE_ROOT,
+    UNPAYWALL_CACHE_TTL_DAYS,
     FallbackConfig,
+    JsonFileCache,
     process_doi,
     resolve_scihub_command,
+    unpaywall_cache,
+    write_json_summary,
 )
-from search_scopus import extract_entries, scopus_request  # noqa: E402
+from http_client import json_dumps, json_loads  # noqa: E402
+from search_scopus import (  # noqa: E402
+    escape_quotes,
+    extract_entries,
+    scopus_request_with_headers,
+)
+
+DOWNLOAD_CONCURRENCY = 4
+SCOPUS_RATE_LIMIT = 6.0
+# Start spacing requests out once Elsevier reports this few calls left...
+RATE_LIMIT_LOW_WATER = 2
+# ...but only when its reset is this close; the weekly quota reset is not worth waiting for.
+MAX_RATE_LIMIT_WAIT = 60.0
+# Smallest page requested once the first page has shown how many entries lack DOIs.
+MIN_PAGE_SIZE = 5
+# Stop paging after this many pages in a row whose DOIs were all seen already.
+MAX_DUPLICATE_PAGES = 2
+# Titles shorter than this ("Editorial", "Introduction") are too generic to dedupe on.
+MIN_TITLE_DEDUPE_TOKENS = 4
+
+_TITLE_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Lowercased placeholders Scopus (or build_entry's "N/A" default) uses for a missing DOI.
+_BAD_DOIS = frozenset({"", "n/a", "na", "none"})
+SCOPUS_CACHE_TTL_DAYS = 1.0
+# Per-outdir record of finished downloads, so reruns skip DOIs already on disk.
+MANIFEST_NAME = ".manifest.json"
 
 
 @dataclass
@@ -39,6 +75,53 @@ class QueryPlan:
     from_year: Optional[int]
 
 
+class RateLimiter:
+    """Token bucket pacing calls to `rate` per second (bursts up to `burst`).
+
+    It also slows down when the server's X-RateLimit-Remaining/-Reset headers
+    show the window is nearly used up.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._not_before:
+                time.sleep(self._not_before - now)
+                now = time.monotonic()
+            if self.rate <= 0:
+                return
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens < 1.0:
+                time.sleep((1.0 - self._tokens) / self.rate)
+                self._stamp = time.monotonic()
+                self._tokens = 1.0
+            self._tokens -= 1.0
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        try:
+            remaining = int(headers.get("X-RateLimit-Remaining") or "")
+            reset = float(headers.get("X-RateLimit-Reset") or "")
+        except ValueError:
+            return
+        if remaining > RATE_LIMIT_LOW_WATER:
+            return
+        # X-RateLimit-Reset is epoch seconds; spread what is left over the window.
+        window = reset - time.time()
+        if window <= 0 or window > MAX_RATE_LIMIT_WAIT:
+            return
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + window / (remaining + 1))
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description=(
@@ -107,8 +190,34 @@ def parse_args() -> argparse.Namespace:
             "otherwise -citedby-count"
         ),
     )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=SCOPUS_RATE_LIMIT,
+        help=f"Max Scopus requests per second; 0 disables pacing (default: {SCOPUS_RATE_LIMIT:g})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Do not read or write the Scopus/Unpaywall response caches under {CACHE_ROOT}",
+    )
+    parser.add_argument(
+        "--scopus-cache-ttl",
+        type=float,
+        default=SCOPUS_CACHE_TTL_DAYS,
+        help=(
+            f"Days a cached Scopus page stays valid (default: {SCOPUS_CACHE_TTL_DAYS:g}); "
+            f"Unpaywall records keep their {UNPAYWALL_CACHE_TTL_DAYS:g}-day TTL"
+        ),
+    )
     parser.add_argument("--timeout", type=int, default=45, help="HTTP timeout seconds")
     parser.add_argument("--outdir", default="./downloads", help="Output directory")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DOWNLOAD_CONCURRENCY,
+        help=f"DOIs downloaded in parallel (default: {DOWNLOAD_CONCURRENCY})",
+    )
 
     parser.add_argument(
         "--scihub-fallback",
@@ -120,7 +229,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--scihub-timeout", type=int, default=180, help="Fallback timeout seconds")
 
     parser.add_argument("--json", action="store_true", help="Emit JSON summary")
-    parser.add_argument("--out", help="Write JSON summary to file path")
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help=(
+            "Stream one JSON object per line instead: a _meta header, each result as it "
+            "finishes, then a _summary line with the counts (takes precedence over --json)"
+        ),
+    )
+    parser.add_argument("--out", help="Write JSON/NDJSON output to file path")
     return parser.parse_args()
 
 
@@ -128,10 +245,8 @@ def build_base_query(args: argparse.Namespace) -> str:
     if args.query:
         return args.query
     if args.title:
-        safe_title = args.title.replace("\\", "\\\\").replace('"', '\\"')
-        return f'TITLE("{safe_title}")'
-    safe_kw = (args.keywords or "").replace("\\", "\\\\").replace('"', '\\"')
-    return f'TITLE-ABS-KEY("{safe_kw}")'
+        return f'TITLE("{escape_quotes(args.title)}")'
+    return f'TITLE-ABS-KEY("{escape_quotes(args.keywords or "")}")'
 
 
 def resolve_from_year(args: argparse.Namespace) -> Optional[int]:
@@ -197,87 +312,376 @@ def decide_plan(args: argparse.Namespace) -> QuantityPlan:
     )
 
 
-def collect_candidate_entries(
+def scopus_cache(ttl_days: float) -> JsonFileCache:
+    return JsonFileCache(root=CACHE_ROOT / "scopus", ttl_seconds=ttl_days * 86400)
+
+
+def fetch_scopus_page(
+    api_key: str,
+    query: str,
+    count: int,
+    start: int,
+    sort: str,
+    cache: Optional[JsonFileCache] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> Dict[str, Any]:
+    """One raw Scopus page; cache hits skip both the request and the rate limiter."""
+    key = f"{query}|{sort}|{start}|{count}"
+    if cache is not None:
+        raw = cache.get(key)
+        if raw is not None:
+            return raw
+    if limiter is not None:
+        limiter.acquire()
+    raw, headers = scopus_request_with_headers(
+        api_key=api_key, query=query, count=count, start=start, sort=sort
+    )
+    if limiter is not None:
+        limiter.observe(headers)
+    if cache is not None:
+        cache.put(key, raw)
+    return raw
+
+
+def title_key(title: Optional[str]) -> str:
+    """Order-insensitive lowercase token key, e.g. for a preprint and its published version."""
+    tokens = _TITLE_TOKEN_RE.findall((title or "").lower())
+    if len(tokens) < MIN_TITLE_DEDUPE_TOKENS:
+        return ""
+    return " ".join(sorted(tokens))[:120]
+
+
+def iter_candidate_entries(
     api_key: str,
     query: str,
     page_size: int,
     sort: str,
     plan: QuantityPlan,
-) -> Dict[str, Any]:
+    stats: Dict[str, Any],
+    limiter: Optional[RateLimiter] = None,
+    cache: Optional[JsonFileCache] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield DOI-bearing Scopus entries page by page, so downloads can start early.
+
+    Entries are deduplicated on the case-folded DOI and on title_key(), which
+    catches the same paper listed under preprint and published DOIs.
+
+    Counters go into `stats` (total_hits, scanned, missing_doi, duplicate_titles,
+    candidates, scopus_error, stop_reason). stop_reason stays None when the
+    caller stops pulling first. A failure on the first page is raised; a
+    failure on a later page ends the stream and is recorded as scopus_error.
+    """
+    stats.update(
+        total_hits=0,
+        scanned=0,
+        missing_doi=0,
+        duplicate_titles=0,
+        candidates=0,
+        scopus_error=None,
+        stop_reason=None,
+    )
     start = 0
     total_hits: Optional[int] = None
-    candidates: List[Dict[str, Any]] = []
     seen_dois = set()
-    missing_doi = 0
+    seen_titles = set()
+    consecutive_dup_pages = 0
 
-    while start < plan.search_cap and len(candidates) < plan.attempt_cap:
+    while start < plan.search_cap:
         count = min(max(1, page_size), plan.search_cap - start)
-        raw = scopus_request(api_key=api_key, query=query, count=count, start=start, sort=sort)
-        parsed = extract_entries(raw)
+        if start:
+            # Ask only for roughly what is still needed, padded for entries without a DOI.
+            need = plan.attempt_cap - stats["candidates"]
+            miss_rate = stats["missing_doi"] / start
+            count = min(count, max(MIN_PAGE_SIZE, int(need / max(0.1, 1 - miss_rate)) + 2))
+        try:
+            raw = fetch_scopus_page(api_key, query, count, start, sort, cache, limiter)
+            # Parsed inside the try: a malformed later page must not abort the run.
+            parsed = extract_entries(raw)
+        except Exception as exc:  # noqa: BLE001
+            if start == 0:
+                raise
+            stats["scopus_error"] = str(exc)
+            stats["stop_reason"] = "scopus_error"
+            return
 
         if total_hits is None:
             total_hits = parsed["total"]
+            stats["total_hits"] = total_hits
 
         entries = parsed["entries"]
         if not entries:
+            stats["stop_reason"] = "exhausted"
             break
-
-        for entry in entries:
-            doi = (entry.get("doi") or "").strip()
-            if not doi or doi.upper() == "N/A":
-                missing_doi += 1
-                continue
-            if doi in seen_dois:
+        start += len(entries)
+        stats["scanned"] = start
+
+        # Normalize the whole page in one pass. DOIs are case-insensitive and
+        # Scopus occasionally returns mixed-case variants.
+        keyed = [
+            (sys.intern(key), entry)
+            for entry in entries
+            for key in ((entry.get("doi") or "").strip().lower(),)
+            if key not in _BAD_DOIS
+        ]
+        stats["missing_doi"] += len(entries) - len(keyed)
+
+        fresh = duplicates = 0
+        for key, entry in keyed:
+            if key in seen_dois:
+                duplicates += 1
                 continue
-            seen_dois.add(doi)
-            candidates.append(entry)
-            if len(candidates) >= plan.attempt_cap:
+            seen_dois.add(key)
+            tkey = title_key(entry.get("title"))
+            if tkey:
+                if tkey in seen_titles:
+                    stats["duplicate_titles"] += 1
+                    duplicates += 1
+                    continue
+                seen_titles.add(tkey)
+            entry["doi_key"] = key
+            fresh += 1
+            stats["candidates"] += 1
+            yield entry
+            if stats["candidates"] >= plan.attempt_cap:
                 break
 
-        start += len(entries)
+        if stats["candidates"] >= plan.attempt_cap:
+            stats["stop_reason"] = "attempt_cap"
+            break
         if total_hits is not None and start >= total_hits:
+            stats["stop_reason"] = "exhausted"
             break
+        if duplicates and not fresh:
+            consecutive_dup_pages += 1
+            if consecutive_dup_pages >= MAX_DUPLICATE_PAGES:
+                stats["stop_reason"] = "duplicate_pages"
+                break
+        elif fresh:
+            consecutive_dup_pages = 0
+    else:
+        stats["stop_reason"] = "search_cap"
+
+
+def load_manifest(outdir: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        data = json_loads((outdir / MANIFEST_NAME).read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
 
+
+def save_manifest(outdir: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+    # Best effort, like the response caches: losing the manifest only costs a re-download.
+    tmp_name: Optional[str] = None
+    try:
+        fd, tmp_name = tempfile.mkstemp(prefix=".manifest_", suffix=".tmp", dir=outdir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(json_dumps(manifest, indent=True))
+        os.replace(tmp_name, outdir / MANIFEST_NAME)
+        tmp_name = None
+    except OSError as exc:
+        print(f"Could not write {outdir / MANIFEST_NAME}: {exc}", file=sys.stderr)
+    finally:
+        if tmp_name is not None:
+            Path(tmp_name).unlink(missing_ok=True)
+
+
+def manifest_key(entry: Dict[str, Any]) -> str:
+    return entry.get("doi_key") or entry["doi"].lower()
+
+
+def cached_result(
+    entry: Dict[str, Any],
+    manifest: Dict[str, Dict[str, Any]],
+    outdir: Path,
+) -> Optional[Dict[str, Any]]:
+    """Result for a DOI downloaded by an earlier run, if its file is still there."""
+    record = manifest.get(manifest_key(entry))
+    if not record or not record.get("file"):
+        return None
+    path = outdir / record["file"]
+    if not path.is_file():
+        return None
     return {
-        "total_hits": total_hits or 0,
-        "scanned": start,
-        "missing_doi": missing_doi,
-        "candidates": candidates,
+        "doi": entry["doi"],
+        "status": "cached",
+        "title": record.get("title") or entry.get("title"),
+        "resolved_url": record.get("resolved_url"),
+        "path": str(path),
+        "error": None,
+        "download_method": record.get("download_method"),
+        "source": entry.get("source"),
+        "year": entry.get("year"),
+        "cited_by": entry.get("cited_by"),
     }
 
 
-def print_text_summary(summary: Dict[str, Any]) -> None:
-    print(f"Query: {summary['query']}")
-    print(f"Sort: {summary['sort']}")
-    print(f"Latest mode: {summary['latest_mode']}")
-    print(f"From year: {summary['from_year'] if summary['from_year'] is not None else 'N/A'}")
-    print(f"Quantity mode: {summary['quantity_mode']}")
-    print(
-        "Target downloads: "
-        f"{summary['target_downloads'] if summary['target_downloads'] is not None else 'unbounded'}"
+def record_download(
+    manifest: Dict[str, Dict[str, Any]],
+    entry: Dict[str, Any],
+    result: Dict[str, Any],
+) -> None:
+    path = Path(result["path"])
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return
+    manifest[manifest_key(entry)] = {
+        "doi": result["doi"],
+        "file": path.name,
+        "title": result.get("title"),
+        "resolved_url": result.get("resolved_url"),
+        "download_method": result.get("download_method"),
+        "mtime": mtime,
+    }
+
+
+def download_entry(
+    entry: Dict[str, Any],
+    email: Optional[str],
+    outdir: Path,
+    timeout: int,
+    fallback: FallbackConfig,
+    cache: Optional[JsonFileCache] = None,
+) -> Dict[str, Any]:
+    result = process_doi(
+        doi=entry["doi"],
+        email=email,
+        outdir=outdir,
+        timeout=timeout,
+        fallback=fallback,
+        cache=cache,
     )
-    print(f"Search cap: {summary['search_cap']} | Attempt cap: {summary['attempt_cap']}")
-    print(f"Scopus total hits: {summary['scopus_total_hits']}")
-    print(f"Scopus scanned entries: {summary['scopus_scanned_entries']}")
-    print(
+    get = entry.get
+    result["source"] = get("source")
+    result["year"] = get("year")
+    result["cited_by"] = get("cited_by")
+    # Not setdefault: process_doi always sets "title", to None when Unpaywall has none.
+    result["title"] = result["title"] or get("title")
+    return result
+
+
+def download_candidates(
+    candidates: Iterable[Dict[str, Any]],
+    email: Optional[str],
+    outdir: Path,
+    timeout: int,
+    fallback: FallbackConfig,
+    plan: QuantityPlan,
+    concurrency: int,
+    cache: Optional[JsonFileCache] = None,
+    manifest: Optional[Dict[str, Dict[str, Any]]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Download candidates through a sliding window of worker threads.
+
+    New DOIs are only submitted while the downloads already done plus those in
+    flight could still fall short of the success cap, so the cap is never
+    overshot. Results keep candidate order. DOIs found in `manifest` come back
+    as "cached" without a request; new downloads are added to it. on_result
+    is called from this thread with each result as soon as it is known.
+    """
+    caps = [cap for cap in (plan.success_cap, plan.target_downloads) if cap is not None]
+    cap = min(caps) if caps else None
+    finished: Dict[int, Dict[str, Any]] = {}
+    pending: Dict[Future, int] = {}
+    entries: Dict[int, Dict[str, Any]] = {}
+    downloaded = 0
+    source = enumerate(candidates)
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while True:
+            while not exhausted and len(pending) < max(1, concurrency):
+                if cap is not None and downloaded + len(pending) >= cap:
+                    break
+                nxt = next(source, None)
+                if nxt is None:
+                    exhausted = True
+                    break
+                idx, entry = nxt
+                hit = cached_result(entry, manifest, outdir) if manifest else None
+                if hit is not None:
+                    finished[idx] = hit
+                    downloaded += 1
+                    if on_result is not None:
+                        on_result(hit)
+                    continue
+                entries[idx] = entry
+                future = pool.submit(download_entry, entry, email, outdir, timeout, fallback, cache)
+                pending[future] = idx
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = pending.pop(future)
+                entry = entries.pop(idx)
+                result = finished[idx] = future.result()
+                if on_result is not None:
+                    on_result(result)
+                if result.get("status") == "downloaded":
+                    downloaded += 1
+                    if manifest is not None and result.get("path"):
+                        record_download(manifest, entry, result)
+
+    return [finished[idx] for idx in sorted(finished)]
+
+
+def write_ndjson_line(stream: IO[str], obj: Dict[str, Any]) -> None:
+    stream.write(json_dumps(obj).decode("utf-8") + "\n")
+    stream.flush()
+
+
+def print_text_summary(summary: Dict[str, Any]) -> None:
+    # Build the whole report first and write it once; max mode prints 1000+ lines.
+    lines: List[str] = []
+    add = lines.append
+    from_year = summary["from_year"]
+    target = summary["target_downloads"]
+    add(f"Query: {summary['query']}")
+    add(f"Sort: {summary['sort']}")
+    add(f"Latest mode: {summary['latest_mode']}")
+    add(f"From year: {from_year if from_year is not None else 'N/A'}")
+    add(f"Quantity mode: {summary['quantity_mode']}")
+    add(f"Target downloads: {target if target is not None else 'unbounded'}")
+    add(f"Search cap: {summary['search_cap']} | Attempt cap: {summary['attempt_cap']}")
+    add(f"Scopus total hits: {summary['scopus_total_hits']}")
+    add(f"Scopus scanned entries: {summary['scopus_scanned_entries']}")
+    add(
         f"Candidates with DOI: {summary['candidate_count']} | "
         f"Missing DOI in scanned: {summary['missing_doi_count']}"
     )
-    print(f"Downloaded: {summary['downloaded_count']} / Attempted: {summary['attempted_count']}")
-    print()
-
-    for idx, item in enumerate(summary["results"], 1):
-        print(f"{idx}. DOI: {item['doi']}")
-        print(f"   Status: {item['status']}")
-        print(f"   Method: {item.get('download_method') or 'N/A'}")
-        print(f"   Title: {item.get('title') or 'N/A'}")
-        print(f"   Source: {item.get('source') or 'N/A'}")
-        print(f"   Year: {item.get('year') or 'N/A'}")
-        print(f"   Cited by: {item.get('cited_by')}")
-        print(f"   URL: {item.get('resolved_url') or 'N/A'}")
-        print(f"   Path: {item.get('path') or 'N/A'}")
-        if item.get("error"):
-            print(f"   Error: {item['error']}")
+    if summary.get("duplicate_title_count"):
+        add(f"Skipped as same title as an earlier DOI: {summary['duplicate_title_count']}")
+    if summary.get("scopus_error"):
+        add(f"Scopus paging stopped early: {summary['scopus_error']}")
+    elif summary.get("scopus_stop_reason") == "duplicate_pages":
+        add("Scopus paging stopped early: consecutive pages returned only duplicate DOIs")
+    add(f"Downloaded: {summary['downloaded_count']} / Attempted: {summary['attempted_count']}")
+    if summary.get("cached_count"):
+        add(f"Already downloaded (manifest): {summary['cached_count']}")
+    add("")
+
+    results = summary["results"]
+    if not results:
+        add("No downloads.")
+    for idx, item in enumerate(results, 1):
+        get = item.get
+        add(f"{idx}. DOI: {item['doi']}")
+        add(f"   Status: {item['status']}")
+        add(f"   Method: {get('download_method') or 'N/A'}")
+        add(f"   Title: {get('title') or 'N/A'}")
+        add(f"   Source: {get('source') or 'N/A'}")
+        add(f"   Year: {get('year') or 'N/A'}")
+        add(f"   Cited by: {get('cited_by')}")
+        add(f"   URL: {get('resolved_url') or 'N/A'}")
+        add(f"   Path: {get('path') or 'N/A'}")
+        error = get("error")
+        if error:
+            add(f"   Error: {error}")
+
+    add("")
+    sys.stdout.write("\n".join(lines))
 
 
 def main() -> int:
@@ -296,17 +700,25 @@ def main() -> int:
     plan = decide_plan(args)
     query_plan = build_query_plan(args)
 
+    collected: Dict[str, Any] = {}
+    candidates = iter_candidate_entries(
+        api_key=api_key,
+        query=query_plan.query,
+        page_size=args.page_size,
+        sort=query_plan.sort,
+        plan=plan,
+        stats=collected,
+        limiter=RateLimiter(args.rate_limit),
+        cache=None if args.no_cache else scopus_cache(args.scopus_cache_ttl),
+    )
     try:
-        collected = collect_candidate_entries(
-            api_key=api_key,
-            query=query_plan.query,
-            page_size=args.page_size,
-            sort=query_plan.sort,
-            plan=plan,
-        )
+        # Fetch the first page up front so a failing search is reported before any download.
+        first = next(candidates, None)
     except Exception as exc:  # noqa: BLE001
         print(f"Scopus search failed: {exc}", file=sys.stderr)
         return 1
+    if first is not None:
+        candidates = itertools.chain([first], candidates)
 
     fallback_cmd: Optional[List[str]] = None
     fallback_error: Optional[str] = None
@@ -321,37 +733,56 @@ def main() -> int:
         setup_error=fallback_error,
     )
 
-    outdir = Path(args.outdir)
+    # Resolved once here; every PDF, temp file and manifest path is joined onto it.
+    outdir = Path(args.outdir).resolve()
     outdir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(outdir)
+    manifest_before = dict(manifest)
+
+    ndjson: Optional[IO[str]] = None
+    if args.ndjson:
+        ndjson = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+        meta = {
+            "_meta": True,
+            "query": query_plan.query,
+            "sort": query_plan.sort,
+            "latest_mode": query_plan.latest_mode,
+            "from_year": query_plan.from_year,
+            "quantity_mode": plan.mode,
+            "target_downloads": plan.target_downloads,
+            "search_cap": plan.search_cap,
+            "attempt_cap": plan.attempt_cap,
+            "scihub_fallback_mode": args.scihub_fallback,
+            "scihub_fallback_command": " ".join(fallback_cmd) if fallback_cmd else None,
+            "scihub_fallback_setup_error": fallback_error,
+        }
+        write_ndjson_line(ndjson, meta)
 
-    results: List[Dict[str, Any]] = []
-    downloaded = 0
-    attempted = 0
-
-    for entry in collected["candidates"]:
-        doi = entry["doi"]
-        result = process_doi(
-            doi=doi,
-            email=email,
-            outdir=outdir,
-            timeout=args.timeout,
-            fallback=fallback_cfg,
+    try:
+        results = download_candidates(
+            candidates,
+            email,
+            outdir,
+            args.timeout,
+            fallback_cfg,
+            plan,
+            args.concurrency,
+            cache=None if args.no_cache else unpaywall_cache(UNPAYWALL_CACHE_TTL_DAYS),
+            manifest=manifest,
+            on_result=functools.partial(write_ndjson_line, ndjson) if ndjson is not None else None,
         )
-        result["source"] = entry.get("source")
-        result["year"] = entry.get("year")
-        result["cited_by"] = entry.get("cited_by")
-        if not result.get("title"):
-            result["title"] = entry.get("title")
-
-        results.append(result)
-        attempted += 1
-        if result.get("status") == "downloaded":
+    finally:
+        # Also on Ctrl-C or a crash: an interrupted run is the one a rerun should resume.
+        if manifest != manifest_before:
+            save_manifest(outdir, manifest)
+    downloaded = cached = 0
+    for result in results:
+        status = result.get("status")
+        if status == "downloaded":
             downloaded += 1
-
-        if plan.success_cap is not None and downloaded >= plan.success_cap:
-            break
-        if plan.target_downloads is not None and downloaded >= plan.target_downloads:
-            break
+        elif status == "cached":
+            cached += 1
+    attempted = len(results) - cached
 
     summary = {
         "query": query_plan.query,
@@ -364,27 +795,33 @@ def main() -> int:
         "attempt_cap": plan.attempt_cap,
         "scopus_total_hits": collected["total_hits"],
         "scopus_scanned_entries": collected["scanned"],
-        "candidate_count": len(collected["candidates"]),
+        "candidate_count": collected["candidates"],
         "missing_doi_count": collected["missing_doi"],
+        "duplicate_title_count": collected["duplicate_titles"],
+        "scopus_error": collected["scopus_error"],
+        # None: paging was not needed further because the download cap was met.
+        "scopus_stop_reason": collected["stop_reason"] or "download_cap",
         "attempted_count": attempted,
         "downloaded_count": downloaded,
+        "cached_count": cached,
         "scihub_fallback_mode": args.scihub_fallback,
         "scihub_fallback_command": " ".join(fallback_cmd) if fallback_cmd else None,
         "scihub_fallback_setup_error": fallback_error,
         "results": results,
     }
 
-    if args.json:
-        output = json.dumps(summary, ensure_ascii=False, indent=2)
+    if ndjson is not None:
+        totals = {key: value for key, value in summary.items() if key not in meta and key != "results"}
+        write_ndjson_line(ndjson, {"_summary": True, **totals})
         if args.out:
-            Path(args.out).write_text(output, encoding="utf-8")
+            ndjson.close()
             print(args.out)
-        else:
-            print(output)
+    elif args.json:
+        write_json_summary(summary, args.out)
     else:
         print_text_summary(summary)
 
-    return 0 if downloaded > 0 else 1
+    return 0 if downloaded or cached else 1
 
 
 if __name__ == "__main__":